@@ -6,8 +6,12 @@ def example_run():
     from agno.utils.pprint import pprint_run_response
     from agno.workflow import RunResponse
 
+    from dotenv import load_dotenv
     from rich.prompt import Prompt
-    from src.bloger_workflow import BlogPostGenerator
+    from src.bloger_workflow import BlogPostGenerator, normalize_topic
+    from src.storage import create_sqlite_engine
+
+    load_dotenv()
 
     # Fun example prompts to showcase the generator's versatility
     example_prompts = [
@@ -29,7 +33,7 @@ def example_run():
     )
 
     # Convert the topic to a URL-safe string for use in session_id
-    url_safe_topic = topic.lower().replace(" ", "-")
+    url_safe_topic = normalize_topic(topic).replace(" ", "-")
 
     # Initialize the blog post generator workflow
     # - Creates a unique session ID based on the topic
@@ -40,7 +44,7 @@ def example_run():
             table_name="generate_blog_post_workflows",
             mode="workflow",
             auto_upgrade_schema=True,
-            db_file="tmp/blogger_workflows.db",
+            db_engine=create_sqlite_engine("tmp/blogger_workflows.db"),
         ),
         debug_mode=True,
     )
@@ -1,33 +1,201 @@
-from typing import Iterator
+import asyncio
+import importlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+)
 
-from agno.storage.sqlite import SqliteStorage
-from agno.workflow import RunResponse
+from dotenv import load_dotenv
+import orjson
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 import uvicorn
 
-from src.bloger_workflow import BlogPostGenerator
 from src.models import Query
 
+load_dotenv()
+
+if TYPE_CHECKING:
+    from agno.storage.sqlite import SqliteStorage
+
 app = FastAPI()
 
-blog_post_generator = BlogPostGenerator(
-    storage=SqliteStorage(
-        table_name="generate_blog_post_workflows",
-        mode="workflow",
-        auto_upgrade_schema=True,
-        db_file="tmp/blogger_workflows.db",
-    ),
-    debug_mode=True,
+# Upper bound on the number of workflows running at once. Runs beyond it
+# wait for a free worker.
+MAX_WORKFLOW_RUNS = 16
+# How long, in seconds, a request waits for another request's run of the
+# same topic before running the workflow itself
+COALESCE_TIMEOUT = 10 * 60
+
+# The workflows run here rather than in the request handlers, so a run
+# finishes, and releases the requests waiting on it, even if its own client
+# disconnects.
+_workflow_executor = ThreadPoolExecutor(
+    max_workers=MAX_WORKFLOW_RUNS, thread_name_prefix="blog-post-workflow"
 )
 
+# Blog post runs in progress, by session_id. Concurrent requests for the same
+# topic wait for the running workflow instead of starting another one.
+_in_flight: Dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+
+
+_storage: Optional["SqliteStorage"] = None
+_storage_lock = threading.Lock()
+
+
+# The agno/workflow modules pull in the OpenAI, DuckDuckGo, Newspaper4k and
+# SQLAlchemy packages, so they are imported on first use rather than at
+# startup, keeping /health free of that import cost.
+def get_storage() -> "SqliteStorage":
+    """Return the storage shared by every request, so the pooled SQLite
+    connections are reused."""
+    global _storage
+    # Locked so concurrent first requests don't each build an engine
+    with _storage_lock:
+        if _storage is None:
+            from agno.storage.sqlite import SqliteStorage
+
+            from src.storage import create_sqlite_engine
+
+            _storage = SqliteStorage(
+                table_name="generate_blog_post_workflows",
+                mode="workflow",
+                auto_upgrade_schema=True,
+                db_engine=create_sqlite_engine("tmp/blogger_workflows.db"),
+            )
+        return _storage
+
+
+def sse_event(
+    event: Optional[str],
+    content: Optional[str] = None,
+    message: Optional[str] = None,
+) -> bytes:
+    """Format a workflow event as a server-sent event `data:` line."""
+    data = {"event": event}
+    if content is not None:
+        data["content"] = content
+    if message:
+        data["message"] = message
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
 
 @app.get("/health")
 def health_check():
     return {"health": "Ok"}
 
 
+def run_workflow(
+    session_id: str, topic: str, send: Callable[[Optional[bytes]], None]
+) -> Optional[str]:
+    """Run the blog post workflow, passing each of its events to `send` as a
+    server-sent event, and `None` once the run is over.
+
+    Returns:
+        Optional[str]: The text the run streamed, i.e. the blog post.
+    """
+    from src.bloger_workflow import BlogPostGenerator
+
+    # The blog post is taken from the stream rather than the cache, as the
+    # run does not always cache it
+    blog_post_chunks = []
+    try:
+        # A new workflow per request, so concurrent requests do not
+        # overwrite each other's session_id
+        blog_post_generator = BlogPostGenerator(
+            session_id=session_id,
+            storage=get_storage(),
+            debug_mode=True,
+        )
+        blog_post = blog_post_generator.run(
+            topic=topic,
+            use_search_cache=True,
+            use_scrape_cache=True,
+            use_cached_report=True,
+        )
+        for chunk in blog_post:
+            content = chunk.content if isinstance(chunk.content, str) else None
+            if content:
+                blog_post_chunks.append(content)
+            send(
+                sse_event(
+                    getattr(chunk, "event", None),
+                    content,
+                    getattr(chunk, "message", None),
+                )
+            )
+    finally:
+        send(None)
+    return "".join(blog_post_chunks) or None
+
+
+def start_workflow(
+    session_id: str, topic: str
+) -> Tuple[Future, AsyncIterator[bytes]]:
+    """Start `run_workflow` on the workflow executor. Must be called from
+    the event loop.
+
+    Returns:
+        Tuple[Future, AsyncIterator[bytes]]: The future of the generated
+            blog post, and the server-sent events of the run.
+    """
+    loop = asyncio.get_running_loop()
+    events: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+
+    def send(event: Optional[bytes]):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    future = _workflow_executor.submit(run_workflow, session_id, topic, send)
+
+    async def stream() -> AsyncIterator[bytes]:
+        while (event := await events.get()) is not None:
+            yield event
+        # Raise the error the run failed with, if any
+        await asyncio.wrap_future(future)
+
+    return future, stream()
+
+
+def _remove_in_flight(session_id: str, future: Future):
+    with _in_flight_lock:
+        if _in_flight.get(session_id) is future:
+            del _in_flight[session_id]
+
+
+def join_or_start_workflow(
+    session_id: str, topic: str
+) -> Tuple[Future, Optional[AsyncIterator[bytes]]]:
+    """Join the run in progress for `session_id`, or start one that the
+    next requests for it join. Must be called from the event loop.
+
+    Returns:
+        Tuple[Future, Optional[AsyncIterator[bytes]]]: The future of the
+            generated blog post, and the server-sent events of the run if
+            this call started it.
+    """
+    with _in_flight_lock:
+        in_flight = _in_flight.get(session_id)
+        # A finished run may not be cleaned up yet
+        if in_flight is not None and not in_flight.done():
+            return in_flight, None
+        in_flight, stream = start_workflow(session_id, topic)
+        _in_flight[session_id] = in_flight
+
+    # Clean up once the run is over, whether or not its events are read
+    in_flight.add_done_callback(partial(_remove_in_flight, session_id))
+    return in_flight, stream
+
+
 @app.post("/workflow/run")
-def run_agent(query: Query):
+async def run_agent(query: Query):
     """Execute the workflow with caching enabled, to generate Blog Post
     on given topic.
 
@@ -37,20 +205,69 @@ def run_agent(query: Query):
             {"topic": "Latest AI Technologies their and Use-cases"}.
 
     Returns:
-        str: The generated blog post content.
+        StreamingResponse: A `text/event-stream` of the workflow events. Each
+            event is a `data:` line holding a json object with the "event"
+            name and, for text events, the "content" chunk. Search and
+            scrape progress events carry a "message" instead.
     """
+    # The first import of the workflow module takes a while, so it runs in a
+    # thread instead of blocking the event loop, and every other request
+    await asyncio.to_thread(importlib.import_module, "src.bloger_workflow")
+    from agno.run.workflow import RunEvent
+
+    from src.bloger_workflow import get_recent_blog_post, normalize_topic
 
     # Convert the topic to a URL-safe string for use in session_id
-    url_safe_topic = query.topic.lower().replace(" ", "-")
-
-    blog_post_generator.session_id = f"generate-blog-post-on-{url_safe_topic}"
-    blog_post: Iterator[RunResponse] = blog_post_generator.run(
-        topic=query.topic,
-        use_search_cache=True,
-        use_scrape_cache=True,
-        use_cached_report=True,
-    )
-    return blog_post
+    url_safe_topic = normalize_topic(query.topic).replace(" ", "-")
+    session_id = f"generate-blog-post-on-{url_safe_topic}"
+
+    async def completed_stream(blog_post: str) -> AsyncIterator[bytes]:
+        yield sse_event(RunEvent.workflow_completed.value, blog_post)
+
+    # Serve recently generated posts without loading the workflow session
+    blog_post = get_recent_blog_post(session_id, query.topic)
+    if blog_post is not None:
+        return StreamingResponse(
+            completed_stream(blog_post), media_type="text/event-stream"
+        )
+
+    in_flight, leader_stream = join_or_start_workflow(session_id, query.topic)
+    if leader_stream is not None:
+        return StreamingResponse(leader_stream, media_type="text/event-stream")
+
+    async def follower_stream() -> AsyncIterator[bytes]:
+        nonlocal in_flight
+        while True:
+            try:
+                # Shielded, so a timeout or disconnect here doesn't cancel
+                # the shared run
+                blog_post = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(in_flight)),
+                    timeout=COALESCE_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                # Run the workflow here if the shared run takes too long
+                _, stream = start_workflow(session_id, query.topic)
+                break
+            except Exception:
+                blog_post = None
+
+            if blog_post is not None:
+                stream = completed_stream(blog_post)
+                break
+
+            # The shared run failed, run it again, shared with the other
+            # waiting requests
+            in_flight, stream = join_or_start_workflow(
+                session_id, query.topic
+            )
+            if stream is not None:
+                break
+
+        async for event in stream:
+            yield event
+
+    return StreamingResponse(follower_stream(), media_type="text/event-stream")
 
 
 if __name__ == "__main__":
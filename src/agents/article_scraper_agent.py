@@ -5,12 +5,10 @@ from agno.models.openai import OpenAIChat
 from agno.tools.newspaper4k import Newspaper4kTools
 
 from src.models import ScrapedArticle
+from src.openai_client import shared_http_client
 
-article_scraper: Agent = Agent(
-    model=OpenAIChat(id="gpt-4o-mini"),
-    tools=[Newspaper4kTools()],
-    description=dedent(
-        """\
+_DESCRIPTION = dedent(
+    """\
     You are ContentBot-X, a specialist in extracting and processing
     digital content for blog creation. Your expertise includes:
 
@@ -20,9 +18,10 @@ article_scraper: Agent = Agent(
     - Quote and statistic preservation
     - Maintaining source attribution\
     """
-    ),
-    instructions=dedent(
-        """\
+)
+
+_INSTRUCTIONS = dedent(
+    """\
     1. Content Extraction 📑
         - Extract content from the article
         - Preserve important quotes and statistics
@@ -37,6 +36,13 @@ article_scraper: Agent = Agent(
         - Ensure accurate extraction
         - Maintain readability\
     """
-    ),
+)
+
+
+article_scraper: Agent = Agent(
+    model=OpenAIChat(id="gpt-4o-mini", http_client=shared_http_client),
+    tools=[Newspaper4kTools()],
+    description=_DESCRIPTION,
+    instructions=_INSTRUCTIONS,
     response_model=ScrapedArticle,
 )
@@ -4,11 +4,11 @@ from textwrap import dedent
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 
+from src.openai_client import shared_http_client
 
-writer: Agent = Agent(
-    model=OpenAIChat(id="gpt-4o"),
-    description=dedent(
-        """\
+
+_DESCRIPTION = dedent(
+    """\
     You are BlogMaster-X, an elite content creator combining journalistic
     excellence with digital marketing expertise. Your strengths include:
 
@@ -19,9 +19,10 @@ writer: Agent = Agent(
     - Optimizing for SEO while maintaining quality
     - Creating shareable conclusions\
     """
-    ),
-    instructions=dedent(
-        """\
+)
+
+_INSTRUCTIONS = dedent(
+    """\
     1. Content Strategy 📝
         - Craft attention-grabbing headlines
         - Write compelling introductions
@@ -42,9 +43,10 @@ writer: Agent = Agent(
         - Optimize for SEO
         - Add engaging subheadings\
     """
-    ),
-    expected_output=dedent(
-        """\
+)
+
+_EXPECTED_OUTPUT = dedent(
+    """\
     # {Viral-Worthy Headline}
 
     ## Introduction
@@ -70,6 +72,13 @@ writer: Agent = Agent(
     ## Sources
     {Properly attributed sources with links}\
     """
-    ),
+)
+
+
+writer: Agent = Agent(
+    model=OpenAIChat(id="gpt-4o", http_client=shared_http_client),
+    description=_DESCRIPTION,
+    instructions=_INSTRUCTIONS,
+    expected_output=_EXPECTED_OUTPUT,
     markdown=True,
 )
@@ -6,12 +6,10 @@ from agno.models.openai import OpenAIChat
 from agno.tools.duckduckgo import DuckDuckGoTools
 
 from src.models import SearchResults
+from src.openai_client import shared_http_client
 
-searcher: Agent = Agent(
-    model=OpenAIChat(id="gpt-4o-mini"),
-    tools=[DuckDuckGoTools()],
-    description=dedent(
-        """\
+_DESCRIPTION = dedent(
+    """\
     You are BlogResearch-X, an elite research assistant specializing
     in discovering high-quality sources for compelling blog content. 
     Your expertise includes:
@@ -22,9 +20,10 @@ searcher: Agent = Agent(
     - Discovering unique angles and insights
     - Ensuring comprehensive topic coverage\
     """
-    ),
-    instructions=dedent(
-        """\
+)
+
+_INSTRUCTIONS = dedent(
+    """\
     1. Search Strategy 🔍
         - Find 10-15 relevant sources and select the 5-7 best ones
         - Prioritize recent, authoritative content
@@ -38,6 +37,13 @@ searcher: Agent = Agent(
         - Gather both mainstream and expert opinions
         - Find supporting data and statistics\
     """
-    ),
+)
+
+
+searcher: Agent = Agent(
+    model=OpenAIChat(id="gpt-4o-mini", http_client=shared_http_client),
+    tools=[DuckDuckGoTools()],
+    description=_DESCRIPTION,
+    instructions=_INSTRUCTIONS,
     response_model=SearchResults,
 )
@@ -16,25 +16,138 @@ Key capabilities:
 - Source attribution and fact verification
 """
 
-import json
-from typing import Dict, Iterator, Optional
+import random
+import time
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, Optional, Union
 from textwrap import dedent
+from urllib.parse import urlparse
 
 from agno.agent import Agent
-from agno.run.workflow import WorkflowCompletedEvent
+from agno.run.response import RunResponseContentEvent
+from agno.run.workflow import (
+    WorkflowCompletedEvent,
+    WorkflowRunResponseStartedEvent,
+)
 from agno.utils.log import logger
 from agno.workflow import Workflow, RunResponse
+from duckduckgo_search.exceptions import RatelimitException
+from openai import RateLimitError
+import orjson
 
 from src.agents.search_agent import searcher
 from src.agents.article_scraper_agent import article_scraper
 from src.agents.blog_writer_agent import writer
+from src.cache import LRUCache, compress_value, decompress_value
 from src.models import ScrapedArticle, SearchResults
+from src.storage import ScrapedUrlStore, get_scraped_url_store
+
+# Upper bound on the number of articles scraped concurrently
+MAX_SCRAPE_WORKERS = 8
+
+# Retry delays, in seconds, when the search agent fails. Rate limits from
+# DuckDuckGo need a longer cool-down than other transient failures.
+SEARCH_RETRY_MAX_DELAY = 30
+SEARCH_RATE_LIMIT_DELAY = (10, 15)
+
+# Number of scraped articles the writer waits for before it starts; the
+# rest are still scraped and cached, but not used for the current post
+MIN_ARTICLES_TO_WRITE = 3
+
+# Maximum number of characters of each article's content sent to the writer
+MAX_WRITER_ARTICLE_LENGTH = 4000
+
+# Domains that are not worth scraping, as Newspaper4k cannot extract their
+# content (paywalls, login walls and JavaScript-rendered pages)
+BLOCKED_DOMAINS = frozenset(
+    {
+        "bloomberg.com",
+        "facebook.com",
+        "ft.com",
+        "instagram.com",
+        "linkedin.com",
+        "nytimes.com",
+        "tiktok.com",
+        "twitter.com",
+        "wsj.com",
+        "x.com",
+        "youtube.com",
+    }
+)
+
+# How long, in seconds, a scraped URL is reused before it is scraped again
+SCRAPE_CACHE_TTL = 24 * 60 * 60
+
+# Process-local LRU of parsed cache entries, keyed by
+# (session_id, cache name, topic key). Repeat lookups for a topic skip
+# re-validating the payload loaded from the session state.
+_parsed_cache = LRUCache(maxsize=256)
+
+# Process-local LRU in front of the shared table of scraped URLs (see
+# `ScrapedUrlStore`). The session state is scoped to one topic, so these are
+# what let overlapping topics reuse each other's scrapes.
+_scraped_url_cache = LRUCache(maxsize=1024)
+
+# Process-local cache of generated blog posts, keyed by
+# (session_id, topic key). Hot topics are served without going back to the
+# session state.
+BLOG_POST_CACHE_TTL = 60 * 60
+_blog_post_cache = LRUCache(maxsize=512, ttl=BLOG_POST_CACHE_TTL)
+
+
+def normalize_topic(topic: str) -> str:
+    """Return the key under which results for `topic` are cached, so that
+    e.g. "Cats" and " cats " share the same cache entries."""
+    return topic.strip().lower()
+
+
+def get_recent_blog_post(session_id: str, topic: str) -> Optional[str]:
+    """Return the blog post generated for `topic` in this process within the
+    last `BLOG_POST_CACHE_TTL` seconds, without loading the session."""
+    return _blog_post_cache.get((session_id, normalize_topic(topic)))
+
+
+def is_blocked_url(url: str) -> bool:
+    """Whether `url` belongs to one of the `BLOCKED_DOMAINS` or their
+    subdomains."""
+    netloc = urlparse(url).hostname or ""
+    return any(
+        netloc == domain or netloc.endswith("." + domain)
+        for domain in BLOCKED_DOMAINS
+    )
+
+
+def is_rate_limit_error(error: Union[Exception, str]) -> bool:
+    """Whether `error`, an exception or the error message of a failed tool
+    call, is a DuckDuckGo or OpenAI rate limit."""
+    if isinstance(error, (RatelimitException, RateLimitError)):
+        return True
+    # DuckDuckGo answers rate limited requests with "202 Ratelimit"
+    return "202 ratelimit" in str(error).lower()
+
+
+def is_rate_limited_run(run_response: Optional[RunResponse]) -> bool:
+    """Whether any tool call of `run_response` failed on a rate limit. Agno
+    catches the exceptions raised by tools and hands them to the model as
+    the tool result, so they don't reach the caller of `Agent.run`."""
+    if run_response is None or not run_response.tools:
+        return False
+    return any(
+        tool.tool_call_error and is_rate_limit_error(str(tool.result))
+        for tool in run_response.tools
+    )
 
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
+@dataclass
+class WorkflowProgressEvent(WorkflowRunResponseStartedEvent):
+    """Reports progress of the search and scrape stages, before the writer
+    starts streaming. It extends the started event so agno's Workflow
+    accepts it, and keeps `content` empty so progress messages are not
+    added to the blog post."""
+
+    event: str = "WorkflowProgress"
+    message: str = ""
 
 
 class BlogPostGenerator(Workflow):
@@ -71,6 +184,10 @@ class BlogPostGenerator(Workflow):
     ) -> Iterator[RunResponse]:
         logger.info(f"Generating a blog post on: {topic}")
 
+        # Signal the start of the run straight away, so streaming consumers
+        # get an event before the search and scrape stages complete
+        yield WorkflowRunResponseStartedEvent(run_id=self.run_id)
+
         # Use the cached blog post if use_cache is True
         if use_cached_report:
             cached_blog_post = self.get_cached_blog_post(topic)
@@ -95,66 +212,165 @@ class BlogPostGenerator(Workflow):
             )
             return
 
-        # Scrape the search results
-        scraped_articles: Dict[str, ScrapedArticle] = self.scrape_articles(
+        yield WorkflowProgressEvent(
+            run_id=self.run_id,
+            message=f"Found {len(search_results.articles)} articles",
+        )
+
+        # Scrape the search results, and start writing as soon as enough
+        # articles are ready, while the remaining scrapes keep running
+        scraped_articles: Dict[str, ScrapedArticle] = {}
+        scrape_progress = self.scrape_articles(
             topic, search_results, use_scrape_cache
         )
+        reported_count = 0
+        for scraped_articles in scrape_progress:
+            # The scrape yields again once it is done, only report new
+            # articles
+            if len(scraped_articles) > reported_count:
+                reported_count = len(scraped_articles)
+                yield WorkflowProgressEvent(
+                    run_id=self.run_id,
+                    message=f"Scraped {reported_count} articles",
+                )
+            if len(scraped_articles) >= MIN_ARTICLES_TO_WRITE:
+                break
+
+        # If every search result was blocked or failed to scrape, end the
+        # workflow
+        if not scraped_articles:
+            yield WorkflowCompletedEvent(
+                run_id=self.run_id,
+                content=(
+                    f"Sorry, could not find any articles on the topic: {topic}"
+                ),  # no-qa
+            )
+            return
 
         # Prepare the input for the writer
-        writer_input = {
-            "topic": topic,
-            "articles": [v.model_dump() for v in scraped_articles.values()],
-        }
-
-        # Run the writer and yield the response
-        yield from self.writer.run(
-            json.dumps(writer_input, indent=4),
-            stream=True,
-        )
+        writer_input = self.get_writer_input(topic, scraped_articles)
+
+        # Run the writer and yield the response, keeping the streamed text
+        # to cache the blog post
+        writer: Agent = self.copy_agent(self.writer)
+        blog_post_chunks = []
+        try:
+            for event in writer.run(writer_input, stream=True):
+                if isinstance(event, RunResponseContentEvent) and isinstance(
+                    event.content, str
+                ):
+                    blog_post_chunks.append(event.content)
+                yield event
+        finally:
+            # Let the remaining scrapes finish, even if the writer failed,
+            # so they are cached for next runs
+            for scraped_articles in scrape_progress:
+                pass
 
         # Save the blog post in the cache
-        self.add_blog_post_to_cache(topic, self.writer.run_response.content)
+        self.add_blog_post_to_cache(topic, "".join(blog_post_chunks))
+
+    def copy_agent(self, agent: Agent) -> Agent:
+        # Agent.run() keeps per-run state (run_id, run_response, ...) on the
+        # agent instance, and the agents are shared by every workflow
+        # instance, so each run works on its own copy bound to this session
+        return agent.deep_copy(update={"session_id": self.session_id})
+
+    def get_writer_input(
+        self, topic: str, scraped_articles: Dict[str, ScrapedArticle]
+    ) -> str:
+        # Serialize straight to compact json, truncating long article bodies
+        # to keep the writer prompt small
+        articles = []
+        for article in scraped_articles.values():
+            if (
+                article.content is not None
+                and len(article.content) > MAX_WRITER_ARTICLE_LENGTH
+            ):
+                article = article.model_copy(
+                    update={
+                        "content": article.content[:MAX_WRITER_ARTICLE_LENGTH]
+                    }
+                )
+            articles.append(article.model_dump_json())
+
+        return (
+            '{"topic":' + orjson.dumps(topic).decode() + ',"articles":['
+            + ",".join(articles)
+            + "]}"
+        )
 
     def get_cached_blog_post(self, topic: str) -> Optional[str]:
         logger.info("Checking if cached blog post exists")
+        topic_key = normalize_topic(topic)
+        blog_post = get_recent_blog_post(self.session_id, topic)
+        if blog_post is not None:
+            return blog_post
 
-        return self.session_state.get("blog_posts", {}).get(topic)
+        blog_post = self.session_state.get("blog_posts", {}).get(topic_key)
+        if blog_post is not None:
+            _blog_post_cache.set((self.session_id, topic_key), blog_post)
+        return blog_post
 
     def add_blog_post_to_cache(self, topic: str, blog_post: str):
         logger.info(f"Saving blog post for topic: {topic}")
+        topic_key = normalize_topic(topic)
         self.session_state.setdefault("blog_posts", {})
-        self.session_state["blog_posts"][topic] = blog_post
+        self.session_state["blog_posts"][topic_key] = blog_post
+        _blog_post_cache.set((self.session_id, topic_key), blog_post)
 
     def get_cached_search_results(self, topic: str) -> Optional[SearchResults]:
         logger.info("Checking if cached search results exist")
+        topic_key = normalize_topic(topic)
+        parsed_key = (self.session_id, "search_results", topic_key)
+        search_results = _parsed_cache.get(parsed_key)
+        if search_results is not None:
+            return search_results
+
         search_results = self.session_state.get("search_results", {}).get(
-            topic
+            topic_key
         )  # no-qa
-        return (
+        search_results = (
             SearchResults.model_validate(search_results)
             if search_results and isinstance(search_results, dict)
             else search_results
         )
+        if search_results is not None:
+            _parsed_cache.set(parsed_key, search_results)
+        return search_results
 
     def add_search_results_to_cache(
         self, topic: str, search_results: SearchResults
     ):  # no-qa
         logger.info(f"Saving search results for topic: {topic}")
+        topic_key = normalize_topic(topic)
         self.session_state.setdefault("search_results", {})
-        self.session_state["search_results"][topic] = search_results
+        self.session_state["search_results"][topic_key] = search_results
+        _parsed_cache.set(
+            (self.session_id, "search_results", topic_key),
+            search_results,
+        )
 
     def get_cached_scraped_articles(
         self, topic: str
     ) -> Optional[Dict[str, ScrapedArticle]]:
         logger.info("Checking if cached scraped articles exist")
-        scraped_articles = self.session_state.get("scraped_articles", {}).get(
-            topic,
-        )
-        return (
-            ScrapedArticle.model_validate(scraped_articles)
-            if scraped_articles and isinstance(scraped_articles, dict)
-            else scraped_articles
-        )
+        topic_key = normalize_topic(topic)
+        urls = self.session_state.get("scraped_articles", {}).get(topic_key)
+        # Entries saved before articles were stored by URL have no scrape
+        # time to expire them by, so they are scraped again
+        if not urls or not isinstance(urls, list):
+            return None
+
+        # Resolved through the URL cache on every hit, so the articles
+        # expire after SCRAPE_CACHE_TTL
+        scraped_articles = {}
+        for url in urls:
+            article = self.get_cached_scraped_url(url)
+            if article is None:
+                return None
+            scraped_articles[url] = article
+        return scraped_articles
 
     def add_scraped_articles_to_cache(
         self,
@@ -162,8 +378,48 @@ class BlogPostGenerator(Workflow):
         scraped_articles: Dict[str, ScrapedArticle],
     ):
         logger.info(f"Saving scraped articles for topic: {topic}")
+        topic_key = normalize_topic(topic)
         self.session_state.setdefault("scraped_articles", {})
-        self.session_state["scraped_articles"][topic] = scraped_articles
+        # Only the URLs are stored here, the articles are in the URL cache
+        self.session_state["scraped_articles"][topic_key] = list(
+            scraped_articles
+        )
+
+    def get_scraped_url_store(self) -> Optional[ScrapedUrlStore]:
+        db_engine = getattr(self.storage, "db_engine", None)
+        return get_scraped_url_store(db_engine) if db_engine else None
+
+    def get_cached_scraped_url(self, url: str) -> Optional[ScrapedArticle]:
+        cached = _scraped_url_cache.get(url)
+        if cached is None:
+            scraped_url_store = self.get_scraped_url_store()
+            row = scraped_url_store.read(url) if scraped_url_store else None
+            if row is None:
+                return None
+            content, ts = row
+            cached = {
+                "content": ScrapedArticle.model_validate(
+                    decompress_value(content)
+                ),
+                "ts": ts,
+            }
+            _scraped_url_cache.set(url, cached)
+
+        if time.time() - cached["ts"] > SCRAPE_CACHE_TTL:
+            return None
+        return cached["content"]
+
+    def add_scraped_url_to_cache(
+        self, url: str, scraped_article: ScrapedArticle
+    ):  # no-qa
+        ts = time.time()
+        _scraped_url_cache.set(url, {"content": scraped_article, "ts": ts})
+        scraped_url_store = self.get_scraped_url_store()
+        if scraped_url_store is not None:
+            # Store plain, compressed json to keep the stored rows small
+            scraped_url_store.upsert(
+                url, compress_value(scraped_article.model_dump()), ts
+            )
 
     def get_search_results(
         self, topic: str, use_search_cache: bool, num_attempts: int = 3
@@ -172,13 +428,9 @@ class BlogPostGenerator(Workflow):
         # if use_search_cache is True
         if use_search_cache:
             try:
-                search_results_from_cache = self.get_cached_search_results(
-                    topic,
-                )
-                if search_results_from_cache is not None:
-                    search_results = SearchResults.model_validate(
-                        search_results_from_cache
-                    )
+                search_results = self.get_cached_search_results(topic)
+                # Empty results may be a rate limited search, so search again
+                if search_results is not None and search_results.articles:
                     logger.info(
                         f"Found {len(search_results.articles)} "
                         "articles in cache."  # no-qa
@@ -191,13 +443,23 @@ class BlogPostGenerator(Workflow):
 
         # If there are no cached search_results, use the searcher to
         # find the latest articles
+        searcher: Agent = self.copy_agent(self.searcher)
         for attempt in range(num_attempts):
+            rate_limited = False
             try:
-                searcher_response: RunResponse = self.searcher.run(topic)
-                if (
+                searcher_response: RunResponse = searcher.run(topic)
+                # Agno hands tool errors to the model, so a rate limited
+                # search usually comes back as valid, but empty, results
+                rate_limited = is_rate_limited_run(searcher_response)
+                if rate_limited:
+                    logger.warning(
+                        f"Attempt {attempt + 1}/{num_attempts} failed: "
+                        "Search rate limited"
+                    )
+                elif (
                     searcher_response is not None
-                    and searcher_response.content is not None
                     and isinstance(searcher_response.content, SearchResults)
+                    and searcher_response.content.articles
                 ):
                     article_count = len(searcher_response.content.articles)
                     logger.info(
@@ -213,12 +475,25 @@ class BlogPostGenerator(Workflow):
                 else:
                     logger.warning(
                         f"Attempt {attempt + 1}/{num_attempts} failed: "
-                        "Invalid response type"
+                        "No articles found"
                     )
             except Exception as e:
                 logger.warning(
                     f"Attempt {attempt + 1}/{num_attempts} failed: {str(e)}"
                 )  # no-qa
+                rate_limited = is_rate_limit_error(e)
+
+            # Back off before the next attempt
+            if attempt + 1 < num_attempts:
+                if rate_limited:
+                    delay = random.uniform(*SEARCH_RATE_LIMIT_DELAY)
+                else:
+                    delay = min(
+                        2**attempt + random.uniform(0, 1),
+                        SEARCH_RETRY_MAX_DELAY,
+                    )
+                logger.info(f"Retrying search in {delay:.1f}s")
+                time.sleep(delay)
 
         logger.error(
             f"Failed to get search results after {num_attempts} attempts"
@@ -227,7 +502,12 @@ class BlogPostGenerator(Workflow):
 
     def scrape_articles(
         self, topic: str, search_results: SearchResults, use_scrape_cache: bool
-    ) -> Dict[str, ScrapedArticle]:
+    ) -> Iterator[Dict[str, ScrapedArticle]]:
+        """Scrape the search results concurrently.
+
+        Yields the articles scraped so far each time another one is ready,
+        and a final time with all of them once they are saved in the cache.
+        """
         scraped_articles: Dict[str, ScrapedArticle] = {}
 
         # Get cached scraped_articles from the session state
@@ -243,36 +523,88 @@ class BlogPostGenerator(Workflow):
                         f"Found {len(scraped_articles)} scraped "
                         "articles in cache."  # no-qa
                     )
-                    return scraped_articles
+                    yield scraped_articles
+                    return
             except Exception as e:
                 logger.warning(
                     f"Could not read scraped articles from cache: {e}",
                 )
 
-        # Scrape the articles that are not in the cache
+        # Scrape the articles that are not in the cache concurrently, since
+        # each scrape is dominated by network and LLM latency
+        urls_to_scrape = []
+        # URLs already handled: search results often repeat the same URL,
+        # and a cached article may be stored under a different URL than the
+        # one it was found at
+        seen_urls = set()
         for article in search_results.articles:
-            if article.url in scraped_articles:
-                logger.info(f"Found scraped article in cache: {article.url}")
+            if article.url in seen_urls:
+                logger.info(f"Skipping duplicate article: {article.url}")
                 continue
+            seen_urls.add(article.url)
 
-            article_scraper_response: RunResponse = self.article_scraper.run(
-                article.url
-            )
-            if (
-                article_scraper_response is not None
-                and article_scraper_response.content is not None
-                and isinstance(
-                    article_scraper_response.content,
-                    ScrapedArticle,
-                )
-            ):
-                scraped_articles[article_scraper_response.content.url] = (
-                    article_scraper_response.content
-                )
+            if is_blocked_url(article.url):
                 logger.info(
-                    f"Scraped article: {article_scraper_response.content.url}",
-                )
+                    f"Skipping article from blocked domain: {article.url}"
+                )  # no-qa
+                continue
 
-        # Save the scraped articles in the session state
-        self.add_scraped_articles_to_cache(topic, scraped_articles)
-        return scraped_articles
+            if use_scrape_cache:
+                cached_article = self.get_cached_scraped_url(article.url)
+                if cached_article is not None:
+                    logger.info(
+                        f"Found scraped article in URL cache: {article.url}"
+                    )  # no-qa
+                    scraped_articles[article.url] = cached_article
+                    seen_urls.add(cached_article.url)
+                    continue
+
+            urls_to_scrape.append(article.url)
+
+        if urls_to_scrape:
+            max_workers = min(MAX_SCRAPE_WORKERS, len(urls_to_scrape))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(self.scrape_article, url): url
+                    for url in urls_to_scrape
+                }
+                # Report the articles found in the URL cache straight away
+                if scraped_articles:
+                    yield scraped_articles
+
+                for future in as_completed(futures):
+                    try:
+                        scraped_article = future.result()
+                    except Exception as e:
+                        logger.warning(
+                            f"Failed to scrape article {futures[future]}: {e}"
+                        )  # no-qa
+                        continue
+
+                    if scraped_article is not None:
+                        url = futures[future]
+                        scraped_articles[url] = scraped_article
+                        self.add_scraped_url_to_cache(url, scraped_article)
+                        logger.info(f"Scraped article: {scraped_article.url}")
+                        yield scraped_articles
+
+        # Save the scraped articles in the session state, unless there are
+        # none, so the next run tries again
+        if scraped_articles:
+            self.add_scraped_articles_to_cache(topic, scraped_articles)
+        yield scraped_articles
+
+    def scrape_article(self, url: str) -> Optional[ScrapedArticle]:
+        # Each concurrent scrape runs on its own copy of the scraper agent
+        article_scraper: Agent = self.copy_agent(self.article_scraper)
+        article_scraper_response: RunResponse = article_scraper.run(url)
+        if (
+            article_scraper_response is not None
+            and article_scraper_response.content is not None
+            and isinstance(
+                article_scraper_response.content,
+                ScrapedArticle,
+            )
+        ):
+            return article_scraper_response.content
+        return None
@@ -0,0 +1,76 @@
+# Cache: thread-safe, process-local LRU used in front of the session state,
+# and compression of large session state values
+import base64
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+import orjson
+
+# Values whose JSON is larger than this many bytes are stored compressed
+COMPRESS_MIN_SIZE = 2048
+# Prefix of the strings returned by `compress_value` for compressed values
+_COMPRESSED_PREFIX = "zlib:"
+
+
+class LRUCache:
+    """A bounded mapping that evicts the least recently used entry once it
+    holds more than `maxsize` entries. When `ttl` is set, entries also
+    expire `ttl` seconds after they were set. Safe to share between
+    threads."""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (value, expiry time or None)
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = (
+            time.monotonic() + self.ttl if self.ttl is not None else None
+        )
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+def compress_value(value: Any) -> Any:
+    """Return `value` as-is if its JSON is small, otherwise a string holding
+    the compressed JSON. Use `decompress_value` to get the value back.
+
+    The result is still JSON-serializable, so it can be stored in the
+    session state.
+    """
+    data = orjson.dumps(value)
+    if len(data) <= COMPRESS_MIN_SIZE:
+        return value
+    return _COMPRESSED_PREFIX + base64.b85encode(zlib.compress(data)).decode()
+
+
+def decompress_value(value: Any) -> Any:
+    """Reverse `compress_value`. Uncompressed values are returned as-is."""
+    if isinstance(value, str) and value.startswith(_COMPRESSED_PREFIX):
+        data = base64.b85decode(value[len(_COMPRESSED_PREFIX):])
+        return orjson.loads(zlib.decompress(data))
+    return value
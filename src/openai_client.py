@@ -0,0 +1,10 @@
+# OpenAI Client: HTTP connection pool shared by every agent's model
+import httpx
+from openai import DefaultHttpxClient
+
+# agno creates a new OpenAI client for every model call; passing this as
+# `OpenAIChat(http_client=...)` lets those clients reuse open connections
+# instead of each paying for a new TCP + TLS handshake.
+shared_http_client: httpx.Client = DefaultHttpxClient(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=32),
+)
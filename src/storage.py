@@ -0,0 +1,133 @@
+# Storage: SQLite engine tuned for the workflow session cache, and the
+# shared table of scraped URLs
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import Column, MetaData, Table
+from sqlalchemy.sql.expression import select
+from sqlalchemy.types import Float, String
+
+# Applied to every new SQLite connection:
+# - WAL lets readers proceed while a write is in progress
+# - synchronous=NORMAL skips the fsync on every commit (safe with WAL)
+# - busy_timeout waits for locks instead of failing with SQLITE_BUSY
+# - a ~20MB page cache and in-memory temp tables cut disk reads
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def _json_serializer(value: Any) -> str:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def create_sqlite_engine(
+    db_file: str,
+    pool_size: int = 2,
+    max_pool_size: int = 10,
+) -> Engine:
+    """Create a SQLAlchemy engine for the given SQLite file, with
+    `SQLITE_PRAGMAS` applied on every new connection.
+
+    Connections are kept in a `QueuePool` and reused across workflow runs,
+    so the connect and PRAGMA setup cost is only paid when the pool grows.
+    JSON columns, such as the session state, are (de)serialized by orjson.
+    Pass the result to `SqliteStorage(db_engine=...)`.
+
+    Args:
+        db_file (str): Path to the SQLite database file. Parent directories
+            are created if missing.
+        pool_size (int): Number of connections kept open in the pool.
+        max_pool_size (int): Maximum number of connections open at once,
+            including the ones kept in the pool.
+
+    Returns:
+        Engine: The configured SQLAlchemy engine.
+    """
+    db_path = Path(db_file).resolve()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max(max_pool_size - pool_size, 0),
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads,
+    )
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+class ScrapedUrlStore:
+    """Scraped articles by URL, kept in their own table next to the workflow
+    sessions. Workflow sessions are per topic, so this is where scrapes are
+    shared between topics; each URL is stored once."""
+
+    def __init__(self, db_engine: Engine, table_name: str = "scraped_urls"):
+        self.db_engine = db_engine
+        self.table = Table(
+            table_name,
+            MetaData(),
+            Column("url", String, primary_key=True),
+            Column("content", sqlite.JSON),
+            Column("scraped_at", Float),
+        )
+        self.table.create(self.db_engine, checkfirst=True)
+
+    def read(self, url: str) -> Optional[Tuple[Any, float]]:
+        """Return the `(content, scraped_at)` stored for `url`, if any."""
+        with self.db_engine.connect() as connection:
+            row = connection.execute(
+                select(self.table.c.content, self.table.c.scraped_at).where(
+                    self.table.c.url == url
+                )
+            ).first()
+        return None if row is None else (row.content, row.scraped_at)
+
+    def upsert(self, url: str, content: Any, scraped_at: float):
+        stmt = sqlite.insert(self.table).values(
+            url=url, content=content, scraped_at=scraped_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.table.c.url],
+            set_={
+                "content": stmt.excluded.content,
+                "scraped_at": stmt.excluded.scraped_at,
+            },
+        )
+        with self.db_engine.begin() as connection:
+            connection.execute(stmt)
+
+
+_scraped_url_stores: Dict[Engine, ScrapedUrlStore] = {}
+_scraped_url_stores_lock = threading.Lock()
+
+
+def get_scraped_url_store(db_engine: Engine) -> ScrapedUrlStore:
+    """Return the `ScrapedUrlStore` for `db_engine`, creating its table on
+    first use."""
+    # Locked so concurrent first runs don't both try to create the table
+    with _scraped_url_stores_lock:
+        if db_engine not in _scraped_url_stores:
+            _scraped_url_stores[db_engine] = ScrapedUrlStore(db_engine)
+        return _scraped_url_stores[db_engine]
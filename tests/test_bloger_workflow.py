@@ -0,0 +1,184 @@
+import threading
+
+import orjson
+from agno.models.response import ToolExecution
+from agno.run.response import RunResponse, RunResponseContentEvent
+import pytest
+
+import src.bloger_workflow as bloger_workflow
+from src.bloger_workflow import BlogPostGenerator, WorkflowProgressEvent
+from src.cache import LRUCache
+from src.models import NewsArticle, ScrapedArticle, SearchResults
+
+TOPIC = "Latest AI Technologies"
+
+
+class FakeAgent:
+    """Stands in for an agno Agent, answering each run with `respond`."""
+
+    def __init__(self, respond):
+        self.respond = respond
+
+    def deep_copy(self, update=None):
+        return self
+
+    def run(self, message, stream=False):
+        return self.respond(message)
+
+
+def search_results(*urls):
+    return SearchResults(
+        articles=[
+            NewsArticle(title=url, url=url, summary=None) for url in urls
+        ]
+    )
+
+
+def scraped_article(url):
+    return ScrapedArticle(
+        title=url, url=url, summary=None, content=f"Content of {url}"
+    )
+
+
+def write_blog_post(writer_input):
+    return iter(
+        [
+            RunResponseContentEvent(content="Blog post"),
+            RunResponseContentEvent(content=" on AI"),
+        ]
+    )
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    for name in ("_parsed_cache", "_scraped_url_cache", "_blog_post_cache"):
+        cache = getattr(bloger_workflow, name)
+        monkeypatch.setattr(
+            bloger_workflow, name, LRUCache(cache.maxsize, ttl=cache.ttl)
+        )
+
+
+def make_workflow(urls, scrape=None, write=write_blog_post):
+    workflow = BlogPostGenerator(session_id="test-session")
+    workflow.searcher = FakeAgent(
+        lambda topic: RunResponse(content=search_results(*urls))
+    )
+    workflow.article_scraper = FakeAgent(
+        lambda url: RunResponse(content=(scrape or scraped_article)(url))
+    )
+    workflow.writer = FakeAgent(write)
+    return workflow
+
+
+def progress_messages(events):
+    return [
+        event.message
+        for event in events
+        if isinstance(event, WorkflowProgressEvent)
+    ]
+
+
+def test_progress_is_reported_once_per_scraped_article():
+    workflow = make_workflow(["https://a.com/1", "https://b.com/2"])
+
+    events = list(workflow.run(topic=TOPIC))
+
+    assert progress_messages(events) == [
+        "Found 2 articles",
+        "Scraped 1 articles",
+        "Scraped 2 articles",
+    ]
+
+
+def test_scraped_articles_of_a_topic_expire(monkeypatch):
+    scraped_urls = []
+
+    def scrape(url):
+        scraped_urls.append(url)
+        return scraped_article(url)
+
+    workflow = make_workflow(["https://a.com/1"], scrape=scrape)
+    list(workflow.run(topic=TOPIC))
+    list(workflow.run(topic=TOPIC, use_cached_report=False))
+    assert scraped_urls == ["https://a.com/1"]
+
+    now = bloger_workflow.time.time()
+    monkeypatch.setattr(
+        bloger_workflow.time,
+        "time",
+        lambda: now + bloger_workflow.SCRAPE_CACHE_TTL + 1,
+    )
+    list(workflow.run(topic=TOPIC, use_cached_report=False))
+    assert scraped_urls == ["https://a.com/1", "https://a.com/1"]
+
+
+def test_rate_limited_search_is_retried_and_not_cached(monkeypatch):
+    monkeypatch.setattr(bloger_workflow.time, "sleep", lambda seconds: None)
+    responses = [
+        # A rate limited search tool call, answered with no articles
+        RunResponse(
+            content=SearchResults(articles=[]),
+            tools=[
+                ToolExecution(
+                    tool_call_error=True,
+                    result="https://html.duckduckgo.com/html 202 Ratelimit",
+                )
+            ],
+        ),
+        RunResponse(content=search_results("https://a.com/1")),
+    ]
+    workflow = make_workflow([])
+    workflow.searcher = FakeAgent(lambda topic: responses.pop(0))
+
+    events = list(workflow.run(topic=TOPIC))
+
+    assert progress_messages(events)[0] == "Found 1 articles"
+    assert workflow.get_cached_search_results(TOPIC).articles
+
+
+def make_partial_write_workflow(write):
+    """A workflow whose last two articles are only scraped once the writer
+    has started."""
+    urls = [f"https://a.com/{i}" for i in range(5)]
+    writer_started = threading.Event()
+
+    def scrape(url):
+        if url in urls[3:]:
+            assert writer_started.wait(timeout=5)
+        return scraped_article(url)
+
+    def start_writing(writer_input):
+        writer_started.set()
+        return write(writer_input)
+
+    return make_workflow(urls, scrape=scrape, write=start_writing), urls
+
+
+def test_blog_post_written_from_part_of_the_articles_is_cached():
+    writer_inputs = []
+
+    def write(writer_input):
+        writer_inputs.append(orjson.loads(writer_input))
+        return write_blog_post(writer_input)
+
+    workflow, urls = make_partial_write_workflow(write)
+
+    list(workflow.run(topic=TOPIC))
+
+    assert len(writer_inputs[0]["articles"]) == 3
+    assert workflow.get_cached_blog_post(TOPIC) == "Blog post on AI"
+    # The late articles are cached for the next runs
+    assert sorted(workflow.get_cached_scraped_articles(TOPIC)) == urls
+
+
+def test_late_articles_are_cached_when_the_writer_fails():
+    def write(writer_input):
+        raise RuntimeError("Writer failed")
+
+    workflow, urls = make_partial_write_workflow(write)
+
+    with pytest.raises(RuntimeError):
+        list(workflow.run(topic=TOPIC))
+
+    assert workflow.get_cached_blog_post(TOPIC) is None
+    assert sorted(workflow.get_cached_scraped_articles(TOPIC)) == urls
@@ -0,0 +1,144 @@
+import threading
+from concurrent.futures import Future
+
+from agno.run.response import RunResponseContentEvent
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import src.bloger_workflow as bloger_workflow
+
+TOPIC = "Latest AI Technologies"
+
+
+def read_events(body: bytes):
+    return [
+        orjson.loads(line.removeprefix(b"data: "))
+        for line in body.split(b"\n\n")
+        if line
+    ]
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+    assert main._in_flight == {}
+
+
+@pytest.fixture
+def second_request_arrived(monkeypatch):
+    """Set once a second request has checked the blog post cache, which it
+    does right before joining the run in progress. Nothing is cached."""
+    cache_checks = []
+    arrived = threading.Event()
+
+    def get_recent_blog_post(session_id, topic):
+        cache_checks.append(session_id)
+        if len(cache_checks) == 2:
+            arrived.set()
+        return None
+
+    monkeypatch.setattr(
+        bloger_workflow, "get_recent_blog_post", get_recent_blog_post
+    )
+    return arrived
+
+
+def post_concurrently(client, count):
+    responses = []
+
+    def post():
+        response = client.post("/workflow/run", json={"topic": TOPIC})
+        responses.append(read_events(response.content))
+
+    threads = [threading.Thread(target=post) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return sorted(responses, key=lambda events: events[-1]["event"])
+
+
+def test_concurrent_requests_share_one_workflow_run(
+    client, monkeypatch, second_request_arrived
+):
+    runs = []
+
+    def run_workflow(session_id, topic, send):
+        runs.append(session_id)
+        # Keep the run going until the second request joins it
+        assert second_request_arrived.wait(timeout=5)
+        try:
+            send(main.sse_event("RunResponseContent", "Blog post"))
+        finally:
+            send(None)
+        return "Blog post"
+
+    monkeypatch.setattr(main, "run_workflow", run_workflow)
+
+    assert post_concurrently(client, 2) == [
+        [{"event": "RunResponseContent", "content": "Blog post"}],
+        [{"event": "WorkflowCompleted", "content": "Blog post"}],
+    ]
+    assert len(runs) == 1
+
+
+def test_waiting_request_gets_the_streamed_blog_post_when_not_cached(
+    client, monkeypatch, second_request_arrived
+):
+    runs = []
+
+    class FakeBlogPostGenerator:
+        def __init__(self, **kwargs):
+            pass
+
+        def run(self, topic, **kwargs):
+            runs.append(topic)
+            assert second_request_arrived.wait(timeout=5)
+            yield RunResponseContentEvent(content="Blog post")
+            yield RunResponseContentEvent(content=" on AI")
+
+    monkeypatch.setattr(
+        bloger_workflow, "BlogPostGenerator", FakeBlogPostGenerator
+    )
+    monkeypatch.setattr(main, "get_storage", lambda: None)
+
+    assert post_concurrently(client, 2) == [
+        [
+            {"event": "RunResponseContent", "content": "Blog post"},
+            {"event": "RunResponseContent", "content": " on AI"},
+        ],
+        [{"event": "WorkflowCompleted", "content": "Blog post on AI"}],
+    ]
+    assert len(runs) == 1
+
+
+def test_waiting_request_runs_the_workflow_if_the_shared_run_fails(
+    client, monkeypatch
+):
+    monkeypatch.setattr(
+        bloger_workflow, "get_recent_blog_post", lambda *args: None
+    )
+    failed_run = Future()
+    failed_run.set_exception(RuntimeError("Search failed"))
+    session_id = f"generate-blog-post-on-{TOPIC.lower().replace(' ', '-')}"
+    main._in_flight[session_id] = failed_run
+
+    def run_workflow(session_id, topic, send):
+        try:
+            send(main.sse_event("RunResponseContent", "Blog post"))
+        finally:
+            send(None)
+        return "Blog post"
+
+    monkeypatch.setattr(main, "run_workflow", run_workflow)
+    try:
+        response = client.post("/workflow/run", json={"topic": TOPIC})
+    finally:
+        main._in_flight.pop(session_id, None)
+
+    assert read_events(response.content) == [
+        {"event": "RunResponseContent", "content": "Blog post"}
+    ]